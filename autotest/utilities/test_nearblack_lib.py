@@ -30,37 +30,74 @@
 ###############################################################################
 
 
-import array
+import os
 
 import pytest
 
 from osgeo import gdal
 
 ###############################################################################
-# Basic test
+# Source datasets shared by the tests of this module
 
 
-def test_nearblack_lib_1():
+@pytest.fixture(scope="module", autouse=True)
+def _vsimem_sources():
 
-    src_ds = gdal.Open("../gdrivers/data/rgbsmall.tif")
-    ds = gdal.Nearblack("", src_ds, format="MEM", maxNonBlack=0, nearDist=15)
-    assert ds is not None
+    for filename in ("../gdrivers/data/rgbsmall.tif", "data/whiteblackred.tif"):
+        with open(filename, "rb") as f:
+            gdal.FileFromMemBuffer(
+                "/vsimem/test_nearblack_lib/" + os.path.basename(filename), f.read()
+            )
+
+    yield
+
+    gdal.Unlink("/vsimem/test_nearblack_lib/rgbsmall.tif")
+    gdal.Unlink("/vsimem/test_nearblack_lib/whiteblackred.tif")
 
-    assert ds.GetRasterBand(1).Checksum() == 21106, "Bad checksum band 1"
 
-    assert ds.GetRasterBand(2).Checksum() == 20736, "Bad checksum band 2"
+@pytest.fixture(scope="module")
+def rgbsmall():
 
-    assert ds.GetRasterBand(3).Checksum() == 21309, "Bad checksum band 3"
+    return gdal.Open("/vsimem/test_nearblack_lib/rgbsmall.tif")
+
+
+@pytest.fixture(scope="module")
+def nearblack_inplace_result(rgbsmall):
+
+    ds = gdal.GetDriverByName("MEM").CreateCopy("", rgbsmall)
+    ret = gdal.Nearblack(ds, ds, maxNonBlack=0)
+    return ds, ret
 
-    src_gt = src_ds.GetGeoTransform()
-    dst_gt = ds.GetGeoTransform()
-    for i in range(6):
-        assert src_gt[i] == pytest.approx(dst_gt[i], abs=1e-10), "Bad geotransform"
+
+@pytest.fixture(scope="module")
+def rgbsmall_with_alpha(rgbsmall):
+
+    return gdal.Nearblack("", rgbsmall, format="MEM", maxNonBlack=0, setAlpha=True)
+
+
+def _checksums(ds, n=3):
+
+    return [ds.GetRasterBand(i + 1).Checksum() for i in range(n)]
+
+
+###############################################################################
+# Basic test
+
+
+def test_nearblack_lib_1(rgbsmall):
+
+    ds = gdal.Nearblack("", rgbsmall, format="MEM", maxNonBlack=0, nearDist=15)
+    assert ds is not None
+
+    assert _checksums(ds) == [21106, 20736, 21309], "Bad checksum"
+
+    assert ds.GetGeoTransform() == pytest.approx(
+        rgbsmall.GetGeoTransform(), abs=1e-10
+    ), "Bad geotransform"
 
     dst_wkt = ds.GetProjectionRef()
     assert dst_wkt.find('AUTHORITY["EPSG","4326"]') != -1, "Bad projection"
 
-    src_ds = None
     ds = None
 
 
@@ -68,28 +105,24 @@ def test_nearblack_lib_1():
 # Add alpha band
 
 
-def test_nearblack_lib_2():
+def test_nearblack_lib_2(rgbsmall_with_alpha):
 
-    ds = gdal.Nearblack(
-        "", "../gdrivers/data/rgbsmall.tif", format="MEM", maxNonBlack=0, setAlpha=True
-    )
-    assert ds is not None
+    assert rgbsmall_with_alpha is not None
 
-    assert ds.GetRasterBand(4).Checksum() == 22002, "Bad checksum band 0"
-
-    ds = None
+    assert (
+        rgbsmall_with_alpha.GetRasterBand(4).Checksum() == 22002
+    ), "Bad checksum band 0"
 
 
 ###############################################################################
 # Set existing alpha band
 
 
-def test_nearblack_lib_3():
+def test_nearblack_lib_3(rgbsmall_with_alpha):
 
-    src_ds = gdal.Nearblack(
-        "", "../gdrivers/data/rgbsmall.tif", format="MEM", maxNonBlack=0, setAlpha=True
+    ds = gdal.Nearblack(
+        "", rgbsmall_with_alpha, format="MEM", maxNonBlack=0, setAlpha=True
     )
-    ds = gdal.Nearblack("", src_ds, format="MEM", maxNonBlack=0, setAlpha=True)
     assert ds is not None
 
     assert ds.GetRasterBand(4).Checksum() == 22002, "Bad checksum band 0"
@@ -101,11 +134,11 @@ def test_nearblack_lib_3():
 # Test -white
 
 
-def test_nearblack_lib_4():
+def test_nearblack_lib_4(rgbsmall):
 
     src_ds = gdal.Warp(
         "",
-        "../gdrivers/data/rgbsmall.tif",
+        rgbsmall,
         format="MEM",
         warpOptions=["INIT_DEST=255"],
         srcNodata=0,
@@ -124,12 +157,14 @@ def test_nearblack_lib_4():
 # Add mask band
 
 
-def test_nearblack_lib_5():
+@pytest.mark.parametrize("fmt", ["MEM", "GTiff"])
+def test_nearblack_lib_5(request, rgbsmall, fmt):
 
+    filename = "" if fmt == "MEM" else f"/vsimem/{request.node.name}.tif"
     ds = gdal.Nearblack(
-        "/vsimem/test_nearblack_lib_5.tif",
-        "../gdrivers/data/rgbsmall.tif",
-        format="GTiff",
+        filename,
+        rgbsmall,
+        format=fmt,
         maxNonBlack=0,
         setMask=True,
     )
@@ -141,8 +176,9 @@ def test_nearblack_lib_5():
 
     ds = None
 
-    gdal.Unlink("/vsimem/test_nearblack_lib_5.tif")
-    gdal.Unlink("/vsimem/test_nearblack_lib_5.tif.msk")
+    if fmt == "GTiff":
+        gdal.Unlink(filename)
+        gdal.Unlink(filename + ".msk")
 
 
 ###############################################################################
@@ -152,15 +188,14 @@ def test_nearblack_lib_5():
 def test_nearblack_lib_7():
 
     ds = gdal.Nearblack(
-        "", "data/whiteblackred.tif", format="MEM", colors=((0, 0, 0), (255, 255, 255))
+        "",
+        "/vsimem/test_nearblack_lib/whiteblackred.tif",
+        format="MEM",
+        colors=((0, 0, 0), (255, 255, 255)),
     )
     assert ds is not None
 
-    assert (
-        ds.GetRasterBand(1).Checksum() == 418
-        and ds.GetRasterBand(2).Checksum() == 0
-        and ds.GetRasterBand(3).Checksum() == 0
-    ), "Bad checksum"
+    assert _checksums(ds) == [418, 0, 0], "Bad checksum"
 
     ds = None
 
@@ -169,232 +204,13 @@ def test_nearblack_lib_7():
 # Test in-place update
 
 
-def test_nearblack_lib_8():
+def test_nearblack_lib_8(nearblack_inplace_result):
 
-    src_ds = gdal.Open("../gdrivers/data/rgbsmall.tif")
-    ds = gdal.GetDriverByName("MEM").CreateCopy("", src_ds)
-    ret = gdal.Nearblack(ds, ds, maxNonBlack=0)
+    _, ret = nearblack_inplace_result
     assert ret == 1
 
-    assert ds.GetRasterBand(1).Checksum() == 21106, "Bad checksum band 1"
-
-    assert ds.GetRasterBand(2).Checksum() == 20736, "Bad checksum band 2"
-
-    assert ds.GetRasterBand(3).Checksum() == 21309, "Bad checksum band 3"
 
+def test_nearblack_lib_8_checksums(nearblack_inplace_result):
 
-def _test_nearblack(in_array, expected_mask_array, maxNonBlack=0):
-
-    ds = gdal.GetDriverByName("MEM").Create("", len(in_array[0]), len(in_array))
-    ds.WriteRaster(
-        0,
-        0,
-        ds.RasterXSize,
-        ds.RasterYSize,
-        b"".join([array.array("B", x).tobytes() for x in in_array]),
-    )
-    ret_ds = gdal.Nearblack("", ds, maxNonBlack=maxNonBlack, format="MEM", setMask=True)
-    mask_data = ret_ds.GetRasterBand(1).GetMaskBand().ReadRaster()
-    mask_array = []
-    for j in range(ds.RasterYSize):
-        ar = array.array("B")
-        ar.frombytes(mask_data[j * ds.RasterXSize : (j + 1) * ds.RasterXSize])
-        mask_array.append(ar.tolist())
-    assert mask_array == expected_mask_array
-
-
-def test_nearblack_lib_9():
-
-    # all valid -> no erosion
-    _test_nearblack(
-        [
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-        ],
-        [
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-        ],
-        maxNonBlack=1,
-    )
-
-    # all invalid
-    _test_nearblack(
-        [
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-        ],
-        [
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-        ],
-        maxNonBlack=1,
-    )
-
-    # single pixel valid -> eroded
-    _test_nearblack(
-        [
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-            [0, 0, 255, 0, 0],
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-        ],
-        [
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-        ],
-        maxNonBlack=1,
-    )
-
-    # all countour is valid -> no erosion
-    _test_nearblack(
-        [
-            [255, 255, 255, 255, 255],
-            [255, 0, 0, 0, 255],
-            [255, 0, 0, 0, 255],
-            [255, 0, 0, 0, 255],
-            [255, 255, 255, 255, 255],
-        ],
-        [
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-        ],
-        maxNonBlack=1,
-    )
-
-    # erosion from the left
-    _test_nearblack(
-        [
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [0, 0, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-        ],
-        [
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [0, 0, 0, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-        ],
-        maxNonBlack=1,
-    )
-
-    # erosion from the right
-    _test_nearblack(
-        [
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 0, 0],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-        ],
-        [
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 0, 0, 0],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-        ],
-        maxNonBlack=1,
-    )
-
-    # erosion from the top
-    _test_nearblack(
-        [
-            [255, 0, 0, 0, 255],
-            [255, 255, 0, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-        ],
-        [
-            [255, 0, 0, 0, 255],
-            [255, 0, 0, 0, 255],
-            [255, 255, 0, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-        ],
-        maxNonBlack=1,
-    )
-
-    # erosion from the bottom
-    _test_nearblack(
-        [
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 0, 255, 255],
-            [255, 0, 0, 0, 255],
-        ],
-        [
-            [255, 255, 255, 255, 255],
-            [255, 255, 255, 255, 255],
-            [255, 255, 0, 255, 255],
-            [255, 0, 0, 0, 255],
-            [255, 0, 0, 0, 255],
-        ],
-        maxNonBlack=1,
-    )
-
-    # Maybe erosion is a bit too greedy due to top-bottom + bottom-top passes
-    _test_nearblack(
-        [
-            [0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 255, 255, 255, 0, 0],
-            [0, 0, 255, 255, 255, 0, 0],
-            [0, 255, 255, 255, 255, 255, 0],
-            [0, 0, 255, 255, 255, 0, 0],
-            [0, 0, 255, 255, 255, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0],
-        ],
-        [
-            [0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 255, 0, 0, 0],
-            [0, 0, 0, 255, 0, 0, 0],
-            [0, 0, 0, 255, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0],
-        ],
-        maxNonBlack=1,
-    )
-
-    # Maybe erosion is a bit too greedy due to top-bottom + bottom-top passes
-    _test_nearblack(
-        [
-            [0, 0, 0, 0, 255],
-            [0, 255, 255, 0, 0],
-            [255, 255, 255, 255, 255],
-            [255, 0, 255, 255, 0],
-            [0, 0, 0, 255, 0],
-        ],
-        [
-            [0, 0, 0, 0, 255],
-            [0, 0, 0, 0, 0],
-            [0, 0, 255, 0, 0],
-            [0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0],
-        ],
-        maxNonBlack=1,
-    )
+    ds, _ = nearblack_inplace_result
+    assert _checksums(ds) == [21106, 20736, 21309], "Bad checksum"
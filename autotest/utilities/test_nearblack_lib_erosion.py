@@ -0,0 +1,320 @@
+#!/usr/bin/env pytest
+# -*- coding: utf-8 -*-
+###############################################################################
+# $Id$
+#
+# Project:  GDAL/OGR Test Suite
+# Purpose:  nearblack mask erosion testing
+# Author:   Even Rouault <even dot rouault @ spatialys dot com>
+#
+###############################################################################
+# Copyright (c) 2015, Even Rouault <even dot rouault @ spatialys dot com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+###############################################################################
+
+
+import pytest
+
+from osgeo import gdal
+
+# All tests will be skipped if numpy is unavailable.
+np = pytest.importorskip("numpy")
+pytest.importorskip("osgeo.gdal_array")
+
+###############################################################################
+# Test erosion of the mask with maxNonBlack. Each case is
+# (input band, expected mask band, maxNonBlack)
+
+_CASES = [
+    # all valid -> no erosion
+    (
+        np.array(
+            [
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+            ],
+            dtype=np.uint8,
+        ),
+        np.array(
+            [
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+            ],
+            dtype=np.uint8,
+        ),
+        1,
+    ),
+    # all invalid
+    (
+        np.array(
+            [
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+            ],
+            dtype=np.uint8,
+        ),
+        np.array(
+            [
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+            ],
+            dtype=np.uint8,
+        ),
+        1,
+    ),
+    # single pixel valid -> eroded
+    (
+        np.array(
+            [
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+                [0, 0, 255, 0, 0],
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+            ],
+            dtype=np.uint8,
+        ),
+        np.array(
+            [
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+            ],
+            dtype=np.uint8,
+        ),
+        1,
+    ),
+    # all countour is valid -> no erosion
+    (
+        np.array(
+            [
+                [255, 255, 255, 255, 255],
+                [255, 0, 0, 0, 255],
+                [255, 0, 0, 0, 255],
+                [255, 0, 0, 0, 255],
+                [255, 255, 255, 255, 255],
+            ],
+            dtype=np.uint8,
+        ),
+        np.array(
+            [
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+            ],
+            dtype=np.uint8,
+        ),
+        1,
+    ),
+    # erosion from the left
+    (
+        np.array(
+            [
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [0, 0, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+            ],
+            dtype=np.uint8,
+        ),
+        np.array(
+            [
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [0, 0, 0, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+            ],
+            dtype=np.uint8,
+        ),
+        1,
+    ),
+    # erosion from the right
+    (
+        np.array(
+            [
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 0, 0],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+            ],
+            dtype=np.uint8,
+        ),
+        np.array(
+            [
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 0, 0, 0],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+            ],
+            dtype=np.uint8,
+        ),
+        1,
+    ),
+    # erosion from the top
+    (
+        np.array(
+            [
+                [255, 0, 0, 0, 255],
+                [255, 255, 0, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+            ],
+            dtype=np.uint8,
+        ),
+        np.array(
+            [
+                [255, 0, 0, 0, 255],
+                [255, 0, 0, 0, 255],
+                [255, 255, 0, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+            ],
+            dtype=np.uint8,
+        ),
+        1,
+    ),
+    # erosion from the bottom
+    (
+        np.array(
+            [
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 0, 255, 255],
+                [255, 0, 0, 0, 255],
+            ],
+            dtype=np.uint8,
+        ),
+        np.array(
+            [
+                [255, 255, 255, 255, 255],
+                [255, 255, 255, 255, 255],
+                [255, 255, 0, 255, 255],
+                [255, 0, 0, 0, 255],
+                [255, 0, 0, 0, 255],
+            ],
+            dtype=np.uint8,
+        ),
+        1,
+    ),
+    # Maybe erosion is a bit too greedy due to top-bottom + bottom-top passes
+    (
+        np.array(
+            [
+                [0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 255, 255, 255, 0, 0],
+                [0, 0, 255, 255, 255, 0, 0],
+                [0, 255, 255, 255, 255, 255, 0],
+                [0, 0, 255, 255, 255, 0, 0],
+                [0, 0, 255, 255, 255, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0],
+            ],
+            dtype=np.uint8,
+        ),
+        np.array(
+            [
+                [0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 255, 0, 0, 0],
+                [0, 0, 0, 255, 0, 0, 0],
+                [0, 0, 0, 255, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0],
+            ],
+            dtype=np.uint8,
+        ),
+        1,
+    ),
+    # Maybe erosion is a bit too greedy due to top-bottom + bottom-top passes
+    (
+        np.array(
+            [
+                [0, 0, 0, 0, 255],
+                [0, 255, 255, 0, 0],
+                [255, 255, 255, 255, 255],
+                [255, 0, 255, 255, 0],
+                [0, 0, 0, 255, 0],
+            ],
+            dtype=np.uint8,
+        ),
+        np.array(
+            [
+                [0, 0, 0, 0, 255],
+                [0, 0, 0, 0, 0],
+                [0, 0, 255, 0, 0],
+                [0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0],
+            ],
+            dtype=np.uint8,
+        ),
+        1,
+    ),
+]
+
+
+def _test_nearblack(in_array, expected_mask_array, maxNonBlack=0):
+
+    ds = gdal.GetDriverByName("MEM").Create("", in_array.shape[1], in_array.shape[0])
+    ds.GetRasterBand(1).WriteArray(in_array)
+    ret_ds = gdal.Nearblack("", ds, maxNonBlack=maxNonBlack, format="MEM", setMask=True)
+    mask_array = ret_ds.GetRasterBand(1).GetMaskBand().ReadAsArray()
+    assert np.array_equal(mask_array, expected_mask_array), mask_array.tolist()
+
+
+@pytest.mark.parametrize(
+    "in_array,expected_mask_array,maxNonBlack",
+    _CASES,
+    ids=[
+        "all-valid",
+        "all-invalid",
+        "single-pixel",
+        "contour",
+        "left",
+        "right",
+        "top",
+        "bottom",
+        "plus-greedy",
+        "irregular-greedy",
+    ],
+)
+def test_nearblack_lib_9(in_array, expected_mask_array, maxNonBlack):
+
+    _test_nearblack(in_array, expected_mask_array, maxNonBlack)